@@ -5,9 +5,7 @@
 
 from pyts2 import TimeStream
 from pyts2.timestream import FileContentFetcher
-from pyts2.pipeline import *
 from pyts2.utils import CatchSignalThenExit
-import argparse as ap
 import os
 from os.path import realpath
 import sys
@@ -16,6 +14,10 @@ import click
 from click import Choice, Path, DateTime
 from tqdm import tqdm
 
+# NB: pyts2.pipeline is deliberately imported inside the commands that need
+# it: it drags in the whole image stack (imageio, rawpy, cv2, skimage), which
+# costs hundreds of ms on every tstk invocation, including --help.
+
 
 @click.group()
 def tstk_main():
@@ -54,20 +56,24 @@ def bundle(force, informat, bundle, input, output):
               help="Input image format (use extension as lower case for raw formats)")
 @click.argument("input")
 def audit(output, input, ncpus=1, informat=None):
+    from pyts2.pipeline import (TSPipeline, FileStatsStep, DecodeImageFileStep,
+                                ThumbnailStep, ImageMeanColourStep, ScanQRCodesStep)
     pipe = TSPipeline(
         FileStatsStep(),
         DecodeImageFileStep(),
+        ThumbnailStep(),
         ImageMeanColourStep(),
         ScanQRCodesStep(),
     )
 
     ints = TimeStream(input, format=informat)
+    pipe.report.open_streaming(output, evict=True, fields=pipe.report_fields)
     try:
         for image in pipe.process(ints, ncpus=ncpus):
-            if pipe.n % 1000 == 0:
-                pipe.report.save(output)
+            pass
     finally:
-        pipe.report.save(output)
+        pipe.finish()
+        pipe.report.close_streaming()
         click.echo(f"Audited {input}:{informat}, found {pipe.n} files")
 
 
@@ -92,20 +98,24 @@ def audit(output, input, ncpus=1, informat=None):
               help="Output size. Use ROWSxCOLS. One of ROWS or COLS can be omitted to keep aspect ratio.")
 @click.argument("input")
 def downsize(input, output, ncpus, informat, outformat, size, bundle, mode):
+    from pyts2.pipeline import (TSPipeline, DownsizeEncodeStep, DecodeImageFileStep,
+                                CropCentreStep, EncodeImageFileStep)
     if mode == "resize":
-        downsizer = ResizeImageStep(geom=size)
+        # fused decode+resize+encode, which avoids materialising the
+        # full-resolution pixel array
+        pipe = TSPipeline(DownsizeEncodeStep(geom=size, format=outformat))
     elif mode == "centrecrop" or mode == "crop":
-        downsizer = CropCentreStep(geom=size)
-    pipe = TSPipeline(
-        DecodeImageFileStep(),
-        downsizer,
-        EncodeImageFileStep(format=outformat),
-    )
+        pipe = TSPipeline(
+            DecodeImageFileStep(reuse_buffer=True),
+            CropCentreStep(geom=size),
+            EncodeImageFileStep(format=outformat),
+        )
     ints = TimeStream(input, format=informat)
     outts = TimeStream(output, format=outformat, bundle_level=bundle)
     try:
         pipe.process_to(ints, outts, ncpus=ncpus)
     finally:
+        pipe.finish()
         click.echo(f"{mode} {input}:{informat} to {output}:{outformat}, found {pipe.n} files")
 
 
@@ -132,10 +142,18 @@ def downsize(input, output, ncpus, informat, outformat, size, bundle, mode):
 @click.option("--audit-output", "-a", type=Path(writable=True), default=None,
               help="Audit log output TSV. If given, input images will be audited, with the log saved here.")
 def ingest(input, informat, output, bundle, ncpus, downsized_output, downsized_size, downsized_bundle, audit_output):
+    from pyts2.pipeline import (TSPipeline, WriteFileStep, FileStatsStep,
+                                DecodeImageFileStep, ThumbnailStep,
+                                ImageMeanColourStep, ScanQRCodesStep,
+                                ResizeImageStep, EncodeImageFileStep,
+                                DownsizeEncodeStep, RAW_FORMATS)
     ints = TimeStream(input, format=informat)
     outts = TimeStream(output, bundle_level=bundle)
 
-    steps = [WriteFileStep(outts)]
+    # overlap archival writes with decode/downsize work. Only safe in the
+    # serial path: with a worker pool the step runs (and would queue writes)
+    # in worker processes that finish() can't drain.
+    steps = [WriteFileStep(outts, async_writes=(ncpus == 1))]
 
     #if downsized_output is not None or audit_output is not None:
     #    steps.append(DecodeImageFileStep())
@@ -144,6 +162,7 @@ def ingest(input, informat, output, bundle, ncpus, downsized_output, downsized_s
         audit_pipe = TSPipeline(
             FileStatsStep(),
             DecodeImageFileStep(),
+            ThumbnailStep(),
             ImageMeanColourStep(),
             ScanQRCodesStep(),
         )
@@ -152,12 +171,20 @@ def ingest(input, informat, output, bundle, ncpus, downsized_output, downsized_s
 
     if downsized_output is not None:
         downsized_ts = TimeStream(downsized_output, bundle_level=downsized_bundle)
-        downsize_pipeline = TSPipeline(
-            DecodeImageFileStep(),
-            ResizeImageStep(geom=downsized_size),
-            EncodeImageFileStep(format="jpg"),
-            WriteFileStep(downsized_ts),
-        )
+        if informat is not None and informat.lower() not in RAW_FORMATS:
+            # fused path: for JPEG input, libjpeg decodes at reduced DCT
+            # scale, skipping most of the full-resolution IDCT work
+            downsize_pipeline = TSPipeline(
+                DownsizeEncodeStep(geom=downsized_size, format="jpg"),
+                WriteFileStep(downsized_ts),
+            )
+        else:
+            downsize_pipeline = TSPipeline(
+                DecodeImageFileStep(reuse_buffer=True),
+                ResizeImageStep(geom=downsized_size),
+                EncodeImageFileStep(format="jpg"),
+                WriteFileStep(downsized_ts),
+            )
         steps.append(downsize_pipeline)
 
     pipe = TSPipeline(*steps)
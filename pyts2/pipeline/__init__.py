@@ -18,9 +18,12 @@ from .audit import (
 from .resize import (
     ResizeImageStep,
     CropCentreStep,
+    ThumbnailStep,
 )
 from .align_time import AlignStep
+from .fused import DownsizeEncodeStep
 from .imageio import (
+    RAW_FORMATS,
     TimestreamImage,
     DecodeImageFileStep,
     EncodeImageFileStep,
@@ -12,6 +12,7 @@ from .imageio import *
 import numpy as np
 import zbarlight
 import skimage as ski
+from PIL import Image
 
 
 class ImageMeanColourException(Exception):
@@ -46,10 +47,22 @@ class ImageMeanColourStep(PipelineStep):
 
 
 class ScanQRCodesStep(PipelineStep):
+    report_fields = ("QRCodes",)
+
+    # ITU-R BT.601 luma weights, matching PIL's convert("L")
+    _grey_weights = np.array([0.299, 0.587, 0.114])
 
     def process_file(self, file):
         assert hasattr(file, "pixels")  # TODO proper check
-        codes = zbarlight.scan_codes('qrcode', file.pil)
+        pix = file.pixels
+        if len(pix.shape) == 3:
+            # zbar scans greyscale, so go straight there in one fused pass
+            # instead of float -> full RGB uint8 -> PIL -> greyscale
+            grey = (pix[:, :, :3] @ self._grey_weights) * 255
+            image = Image.fromarray(grey.astype("u1"), "L")
+        else:
+            image = file.pil
+        codes = zbarlight.scan_codes('qrcode', image)
         if codes is not None:
             codes = ';'.join(sorted(x.decode('utf8') for x in codes))
         file.report.update({"QRCodes": codes})
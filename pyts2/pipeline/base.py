@@ -6,9 +6,10 @@
 from collections import defaultdict
 from os import path as op
 from sys import stderr, stdout, stdin
+from queue import Queue
+from threading import Thread
 import warnings
 import csv
-import re
 
 from tqdm import tqdm
 
@@ -25,10 +26,34 @@ class TSPipeline(object):
     def __init__(self, *args, reporter=None):
         self.n = 0
         self.steps = list(args)
+        self._pool = None
         if reporter is None:
             reporter = ResultRecorder()
         self.report = reporter
 
+    def __getstate__(self):
+        # worker pools can't be pickled across to worker processes. Nor
+        # should the reporter be: workers never record into it (recording
+        # happens in process() on this side), and since the pool re-pickles
+        # the bound process_file per task chunk, shipping the reporter would
+        # re-serialize every row recorded so far with each chunk — and race
+        # against record() mutating it.
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        state["report"] = ResultRecorder()
+        return state
+
+    @property
+    def report_fields(self):
+        """Fixed report fields of all steps, plus the pipeline's own Errors"""
+        fields = []
+        for step in self.steps:
+            fields.extend(f for f in getattr(step, "report_fields", ())
+                          if f not in fields)
+        if "Errors" not in fields:
+            fields.append("Errors")
+        return fields
+
     def add_step(self, step):
         if not hasattr(step, "process_file"):
             raise ValueError("step doesn't seem to be a pipeline step")
@@ -38,36 +63,161 @@ class TSPipeline(object):
     def process_file(self, file):
         # This should mirror PipelineStep, so an entire pipeline can function
         # as a pipeline step
-        for step in self.steps:
-            try:
+        step = None
+        try:
+            # one try block around the whole chain, rather than entering and
+            # leaving a try per step per file; failures are rare, files many
+            for step in self.steps:
                 file = step.process_file(file)
-            except Exception as exc:
-                warnings.warn(f"pipeline failed at {step.__class__.__name__}: {str(exc)}")
-                file.report["Errors"] = str(exc)
-                return file
+        except Exception as exc:
+            warnings.warn(f"pipeline failed at {step.__class__.__name__}: {str(exc)}")
+            file.report["Errors"] = str(exc)
         return file
 
+    def _get_pool(self, ncpus):
+        """Lazily create a persistent worker pool, reused across process() calls.
+
+        Keeping workers warm avoids paying interpreter startup and module
+        import costs on every call to process().
+        """
+        if self._pool is None:
+            import multiprocessing as mp
+            self._pool = mp.get_context("forkserver").Pool(ncpus, maxtasksperchild=500)
+        return self._pool
+
     def process(self, input_stream, ncpus=1, progress=True):
-        from concurrent.futures import as_completed, ThreadPoolExecutor, ProcessPoolExecutor
+        """Process input_stream through all steps, yielding processed files.
+
+        With ncpus=1 files are processed inline in the calling thread, with
+        no executor or queue overhead; with ncpus>1 a persistent worker pool
+        is used (and reused by later process() calls until finish()).
+        """
         if ncpus > 1:
-            executor = ProcessPoolExecutor(max_workers=ncpus)
+            # Batch files into chunks so each worker round-trip pickles
+            # several files at once, rather than one IPC exchange per file.
+            pool = self._get_pool(ncpus)
+            results = pool.imap_unordered(self.process_file, input_stream,
+                                          chunksize=max(4, 64 // ncpus))
         else:
-            executor = ThreadPoolExecutor()
-        with executor:
-            for file in tqdm(executor.map(self.process_file, input_stream), unit=" files"):
-                if file is None:
-                    continue
-                self.report.record(file.instant, **file.report)
-                self.n += 1
-                yield file
+            results = map(self.process_file, input_stream)
+        for file in tqdm(results, unit=" files", disable=not progress):
+            if file is None:
+                continue
+            self.report.record(file.instant, **file.report)
+            self.n += 1
+            yield file
+
+
+    def process_staged(self, input_stream, ncpus=1, progress=True):
+        """Process files with each pipeline step running concurrently as a stage.
+
+        Unlike process(), where one worker runs every step on a file before
+        moving to the next file, each step here gets its own worker threads
+        connected by bounded queues, so e.g. decoding the next file overlaps
+        with encoding the previous one. Steady-state throughput is then set by
+        the slowest stage rather than the sum of all stages. This pays off
+        when step costs are heterogeneous and the heavy steps release the GIL
+        (decode/encode in imageio/PIL/opencv do).
+        """
+        if not self.steps:
+            yield from self.process(input_stream, ncpus=1, progress=progress)
+            return
 
+        nstages = len(self.steps)
+        queues = [Queue(maxsize=max(4, 2 * ncpus)) for _ in range(nstages + 1)]
+        resultq = queues[-1]
+
+        def run_stage(step, inq, outq):
+            while True:
+                file = inq.get()
+                if file is None:  # poison pill
+                    break
+                try:
+                    file = step.process_file(file)
+                except Exception as exc:
+                    warnings.warn(f"pipeline failed at {step.__class__.__name__}: {str(exc)}")
+                    file.report["Errors"] = str(exc)
+                    # mirror process_file(): skip the remaining steps
+                    resultq.put(file)
+                    continue
+                if file is not None:
+                    outq.put(file)
+
+        # spread workers over stages, with at least one thread per stage
+        stage_threads = []
+        for step, inq, outq in zip(self.steps, queues, queues[1:]):
+            threads = [Thread(target=run_stage, args=(step, inq, outq))
+                       for _ in range(max(1, ncpus // nstages))]
+            for thread in threads:
+                thread.start()
+            stage_threads.append(threads)
+
+        def feed():
+            for file in input_stream:
+                queues[0].put(file)
+            # shut stages down in order: poison-pill each stage's workers,
+            # then wait for them to drain before stopping the next stage
+            for threads, inq in zip(stage_threads, queues):
+                for _ in threads:
+                    inq.put(None)
+                for thread in threads:
+                    thread.join()
+            resultq.put(None)
+
+        feeder = Thread(target=feed)
+        feeder.start()
+        try:
+            with tqdm(unit=" files", disable=not progress) as pbar:
+                while True:
+                    file = resultq.get()
+                    if file is None:
+                        break
+                    self.report.record(file.instant, **file.report)
+                    self.n += 1
+                    pbar.update(1)
+                    yield file
+        finally:
+            feeder.join()
 
     def __call__(self, *args, **kwargs):
         yield from self.process(*args, **kwargs)
 
     def process_to(self, input_stream, output, ncpus=1):
-        for done in self.process(input_stream, ncpus=ncpus):
-            output.write(done)
+        # Write from a dedicated thread so disk write latency overlaps with
+        # decode/encode work done in process().
+        writeq = Queue(maxsize=2 * max(ncpus, 1))
+        write_exc = []
+
+        def writer():
+            while True:
+                file = writeq.get()
+                if file is None:
+                    break
+                try:
+                    output.write(file)
+                except Exception as exc:
+                    # keep consuming so the producer never blocks on a full
+                    # queue; the error is re-raised to the caller below
+                    write_exc.append(exc)
+
+        writer_thread = Thread(target=writer)
+        writer_thread.start()
+        try:
+            for done in self.process(input_stream, ncpus=ncpus):
+                if write_exc:
+                    break
+                writeq.put(done)
+        finally:
+            writeq.put(None)
+            writer_thread.join()
+        if write_exc:
+            raise write_exc[0]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
 
     def write(self, file):
         # TODO needed so that pipelines can be used as files
@@ -80,19 +230,125 @@ class TSPipeline(object):
     def finish(self):
         for step in self.steps:
             step.finish()
+        self.close()
 
 
 class ResultRecorder(object):
 
     def __init__(self):
         self.fields = []
+        self._fields_set = set()
         self.data = defaultdict(dict)
+        self._stream_path = None
+        self._stream_fh = None
+        self._stream_writer = None
+        self._stream_fields = None
+        self._stream_dirty = False
+        self._stream_evict = False
+        self._pending = []
+        self.flush_interval = 1000
+
+    def __getstate__(self):
+        # open file handles can't cross process boundaries
+        state = self.__dict__.copy()
+        state["_stream_fh"] = None
+        state["_stream_writer"] = None
+        return state
 
     def record(self, instant, **kwargs):
-        for key, val in kwargs.items():
-            if key not in self.fields:
-                self.fields.append(key)
-            self.data[repr(instant)].update(kwargs.copy())
+        if not kwargs:
+            return
+        new = kwargs.keys() - self._fields_set
+        if new:
+            # preserve first-seen field order for the header
+            self.fields.extend(key for key in kwargs if key in new)
+            self._fields_set.update(new)
+        self.data[instant].update(kwargs)
+        if self._stream_path is not None:
+            self._pending.append(instant)
+            if len(self._pending) >= self.flush_interval:
+                self.flush()
+
+    def _format_row(self, instant, record, fields):
+        line = [str(instant), ]
+        for field in fields:
+            val = record.get(field, None)
+            if val is None:
+                val="NA"
+            if isinstance(val, str):
+                # collapse whitespace; str.split/join beats a regex here, and
+                # the old re.sub call passed its flags as the count argument
+                val = " ".join(val.split())
+            line.append(val)
+        return line
+
+    def open_streaming(self, outpath, flush_interval=1000, evict=False, fields=None):
+        """Append rows to `outpath` as they are recorded, rather than
+        rewriting the whole file on each save().
+
+        Rows are written in arrival order, in batches of `flush_interval`.
+        The header (and so the field set) is frozen when the first batch is
+        flushed; in the rare case that later records introduce new fields,
+        the file is rewritten once, with the full schema, at
+        close_streaming().
+
+        With `evict=True`, rows are dropped from memory once written, so
+        memory use stays bounded over arbitrarily long streams. Evicted rows
+        can't be rewritten, so if the field set grows after the header is
+        frozen the late fields are left out of the file, with a warning,
+        instead of the close-time rewrite. Fields that are known up front
+        but may only appear in late records (e.g. "Errors") should therefore
+        be pre-seeded via `fields` so the frozen header covers them.
+        """
+        if fields:
+            for field in fields:
+                if field not in self._fields_set:
+                    self.fields.append(field)
+                    self._fields_set.add(field)
+        self._stream_path = outpath
+        self.flush_interval = flush_interval
+        self._stream_evict = evict
+        self._pending = []
+
+    def flush(self):
+        if self._stream_path is None or not self._pending:
+            return
+        if self._stream_fh is None:
+            self._stream_fh = open(self._stream_path, "w", buffering=64*1024)
+            self._stream_writer = csv.writer(self._stream_fh, dialect='tsv')
+            self._stream_fields = list(self.fields)
+            self._stream_writer.writerow(["Instant"] + self._stream_fields)
+        if not self._stream_dirty and \
+                any(field not in self._stream_fields for field in self.fields):
+            # schema grew after the header was written; fix up at close
+            self._stream_dirty = True
+            if self._stream_evict:
+                missing = [f for f in self.fields if f not in self._stream_fields]
+                warnings.warn(f"fields {missing} appeared after the report header "
+                              f"was written and will be missing from {self._stream_path}")
+        for instant in dict.fromkeys(self._pending):
+            self._stream_writer.writerow(
+                self._format_row(instant, self.data[instant], self._stream_fields))
+            if self._stream_evict:
+                del self.data[instant]
+        self._pending.clear()
+        self._stream_fh.flush()
+
+    def close_streaming(self):
+        if self._stream_path is None:
+            return
+        self.flush()
+        if self._stream_fh is not None:
+            self._stream_fh.close()
+            self._stream_fh = None
+            self._stream_writer = None
+        if self._stream_dirty and not self._stream_evict:
+            # late-arriving fields mean the streamed header is incomplete:
+            # rewrite once with the full schema
+            self.save(self._stream_path)
+        self._stream_path = None
+        self._stream_fields = None
+        self._stream_dirty = False
 
     def save(self, outpath, delim="\t"):
         if len(self.data) < 1:
@@ -102,15 +358,7 @@ class ResultRecorder(object):
             tsvw = csv.writer(fh, dialect='tsv')
             tsvw.writerow(["Instant"] + self.fields)
             for instant, record in sorted(self.data.items()):
-                line = [instant, ]
-                for field in self.fields:
-                    val = record.get(field, None)
-                    if val is None:
-                        val="NA"
-                    if isinstance(val, str):
-                        val = re.sub(r"\s+", " ", val, re.IGNORECASE | re.MULTILINE)
-                    line.append(val)
-                tsvw.writerow(line)
+                tsvw.writerow(self._format_row(instant, record, self.fields))
 
 
 ##########################################################################################
@@ -125,6 +373,10 @@ class PipelineStep(object):
     argument `file`, and returns either TimestreamFile or a subclass of it.
     """
 
+    #: Report fields this step always records, used to pre-seed streaming
+    #: report headers. Steps whose fields depend on the data leave this empty.
+    report_fields = ()
+
     def process_file(self, file):
         return file
 
@@ -138,16 +390,15 @@ class ResultRecorderStep(PipelineStep):
         self.n = 0
         self.output_file = output_file
         self.report = ResultRecorder()
-        self.write_interval = 1000  # write results every write_interval images
+        self.write_interval = 1000  # flush results every write_interval images
+        self.report.open_streaming(output_file, flush_interval=self.write_interval)
 
     def process_file(self, file):
         self.report.record(file.instant, **file.report)
         self.n += 1
-        if self.n % self.write_interval == 0:
-            self.report.save(self.output_file)
 
     def finish(self):
-        self.report.save(self.output_file)
+        self.report.close_streaming()
 
 
 class CopyStep(PipelineStep):
@@ -156,17 +407,67 @@ class CopyStep(PipelineStep):
 
 
 class WriteFileStep(PipelineStep):
-    """Write each file to output, without changing the file"""
-    def __init__(self, output):
+    """Write each file to output, without changing the file
+
+    :param async_writes: Queue writes to a dedicated writer thread so output
+        IO overlaps with processing of the next file, rather than blocking
+        the pipeline. finish() drains outstanding writes. Only safe when
+        this step runs in the process that calls finish(), i.e. not inside
+        a multi-process worker pool.
+    """
+    def __init__(self, output, async_writes=False, queue_depth=32):
         self.output = output
+        self.async_writes = async_writes
+        self.queue_depth = queue_depth
+        self._writeq = None
+        self._writer = None
+        self._write_exc = None
+
+    def __getstate__(self):
+        # queues/threads can't cross process boundaries
+        state = self.__dict__.copy()
+        state["_writeq"] = None
+        state["_writer"] = None
+        return state
+
+    def _write_worker(self):
+        while True:
+            file = self._writeq.get()
+            if file is None:
+                break
+            try:
+                self.output.write(file)
+            except Exception as exc:
+                self._write_exc = exc
 
     def process_file(self, file):
-        self.output.write(file)
+        if not self.async_writes:
+            self.output.write(file)
+            return file
+        if self._write_exc is not None:
+            raise self._write_exc
+        if self._writer is None:
+            self._writeq = Queue(maxsize=self.queue_depth)
+            self._writer = Thread(target=self._write_worker)
+            self._writer.start()
+        self._writeq.put(file)
         return file
 
+    def finish(self):
+        if self._writer is not None:
+            self._writeq.put(None)
+            self._writer.join()
+            self._writer = None
+            self._writeq = None
+        if self._write_exc is not None:
+            exc, self._write_exc = self._write_exc, None
+            raise exc
+
 
 class FileStatsStep(PipelineStep):
+    report_fields = ("FileName", "FileSize")
+
     def process_file(self, file):
         file.report.update({"FileName": op.basename(file.filename),
-                            "FileSize": len(file.content)})
+                            "FileSize": file.size})
         return file
@@ -0,0 +1,82 @@
+# Copyright (c) 2018 Kevin Murray <kdmfoss@gmail.com>
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from ..timestream import TimestreamFile
+from .imageio import raiseimageio
+from .resize import GenericDownsizerStep
+
+import io
+import os.path as op
+
+from PIL import Image
+
+
+class DownsizeEncodeStep(GenericDownsizerStep):
+    """Fused decode+resize+encode step for downsizing images.
+
+    Replaces the DecodeImageFileStep -> ResizeImageStep -> EncodeImageFileStep
+    chain with a single step that never materialises the full-resolution pixel
+    array. For JPEG inputs, PIL's draft() mode lets libjpeg IDCT-downscale to
+    1/2, 1/4 or 1/8 size during decode, so for large images most pixels are
+    never decoded at all; the (much smaller) drafted image is then resized to
+    the exact target and encoded straight back to bytes.
+    """
+
+    default_options = {
+        "jpg": {
+            "format": "JPEG",
+            "quality": 95,
+            "progressive": True,
+            "optimize": True,
+            "subsampling": "4:4:4",
+        },
+        "tif": {
+            "format": "TIFF",
+            "compression": "tiff_lzw",
+        },
+        "png": {
+            "format": "PNG",
+            "optimize": True,
+        },
+    }
+
+    def __init__(self, rows=None, cols=None, scale=None, geom=None,
+                 format="jpg", encode_options=None):
+        super().__init__(rows=rows, cols=cols, scale=scale, geom=geom)
+
+        # Normalise format, as in EncodeImageFileStep
+        format = format.lower()
+        if format == "jpeg":
+            format = "jpg"
+        if format == "tiff":
+            format = "tif"
+        if format not in self.default_options:
+            raise ValueError("Unsupported image format '{}'".format(format))
+        self.format = format
+
+        self.options = self.default_options[self.format].copy()
+        if encode_options:
+            self.options.update(encode_options)
+
+    @raiseimageio
+    def process_file(self, file):
+        im = Image.open(io.BytesIO(file.content))
+        rows, cols = self._new_imagesize((im.height, im.width, None))
+        # no-op for non-JPEG inputs; ask for 2x the target so the final
+        # resize still has headroom to antialias
+        im.draft("RGB", (2 * cols, 2 * rows))
+        if im.mode != "RGB":
+            im = im.convert("RGB")
+        im = im.resize((cols, rows), Image.BILINEAR)
+
+        with io.BytesIO() as buf:
+            im.save(buf, **self.options)
+            content = buf.getvalue()
+
+        base, ext = op.splitext(file.filename)
+        filename = f"{base}.{self.format}"
+        return TimestreamFile(content=content, filename=filename,
+                              instant=file.instant, report=file.report,
+                              format=self.format)
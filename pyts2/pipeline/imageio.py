@@ -13,6 +13,7 @@ import os.path as op
 import re
 import io
 import sys
+import threading
 
 import imageio
 import numpy as np
@@ -26,6 +27,10 @@ class ImageIOError(Exception):
     pass
 
 
+#: Raw formats that need rawpy rather than imageio/PIL to decode
+RAW_FORMATS = ("cr2", "nef", "rw2")
+
+
 def raiseimageio(func):
     """Decorator to raise an ImageIOError if anything goes wrong with `func`."""
     def wrapped(*args, **kwargs):
@@ -46,6 +51,11 @@ class DecodeImageFileStep(PipelineStep):
         string containing a path to file (unless imageio can read it)
     :params raw_process_params: Parameters passed to rawpy during raw image
         prostprocessing.
+    :param reuse_buffer: Reuse one preallocated float pixel buffer across
+        files (one buffer per worker thread). This avoids a large allocation
+        per image when all images share dimensions, but is only safe when
+        each decoded image is fully consumed (encoded or discarded) before
+        the next file is processed, as in the downsize/ingest pipelines.
     :return: Numpy array of pixel values
     """
     default_options = {
@@ -59,17 +69,40 @@ class DecodeImageFileStep(PipelineStep):
             "auto_bright_thr": 0.001, # Use auto brightness, but only allow clipping 0.1%
         },
     }
-    def __init__(self, decode_options=None, process_raws=True):
+    def __init__(self, decode_options=None, process_raws=True, reuse_buffer=False):
         self.decode_options = self.default_options
         if decode_options:
             self.decode_options.update(self.decode_options)
         self.process_raws = process_raws
+        self.reuse_buffer = reuse_buffer
+        self._local = threading.local()
+
+    def __getstate__(self):
+        # thread-locals can't be pickled to worker processes
+        state = self.__dict__.copy()
+        state["_local"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def _as_float(self, pixels):
+        """Float-convert pixels, reusing this worker's buffer if enabled."""
+        if not self.reuse_buffer or pixels.dtype.kind != "u":
+            return ski.img_as_float(pixels)
+        buf = getattr(self._local, "buf", None)
+        if buf is None or buf.shape != pixels.shape:
+            buf = np.empty(pixels.shape, dtype=np.float64)
+            self._local.buf = buf
+        np.divide(pixels, np.iinfo(pixels.dtype).max, out=buf)
+        return buf
 
     @raiseimageio
     def process_file(self, file):
         base, ext = op.splitext(file.filename)
         format = ext.lower().strip(".")
-        if format in ("cr2", "nef", "rw2"):
+        if format in RAW_FORMATS:
             with rawpy.imread(io.BytesIO(file.content)) as img:
                 if self.process_raws:
                     pixels = img.postprocess(**self.decode_options[format].copy())
@@ -77,7 +110,7 @@ class DecodeImageFileStep(PipelineStep):
                     pixels = img.raw_image.copy()
         else:
             pixels = imageio.imread(file.content)
-        return TimestreamImage.from_timestreamfile(file, pixels=pixels)
+        return TimestreamImage.from_timestreamfile(file, pixels=self._as_float(pixels))
 
 
 class EncodeImageFileStep(PipelineStep):
@@ -5,8 +5,11 @@
 
 import datetime
 import calendar
+import functools
 import re
+import sys
 import os.path as op
+from dataclasses import dataclass, field
 
 import iso8601
 
@@ -28,6 +31,21 @@ def parse_date(datestr):
     '''Parses dates in iso8601-ish formats to datetime.datetime objects'''
     if isinstance(datestr, datetime.datetime):
         return datestr
+    return _parse_date_str(datestr)
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_str(datestr):
+    # fast path for our own fixed-width TS_DATEFMT: direct int conversion is
+    # several times faster than strptime, and this is by far the most common
+    # format when scanning timestreams
+    if len(datestr) == 19 and datestr[4] == "_":
+        try:
+            return datetime.datetime(int(datestr[0:4]), int(datestr[5:7]),
+                                     int(datestr[8:10]), int(datestr[11:13]),
+                                     int(datestr[14:16]), int(datestr[17:19]))
+        except ValueError:
+            pass
 
     # first, try iso8601 of some form
     try:
@@ -50,7 +68,8 @@ def parse_date(datestr):
     raise ValueError("date string '" + datestr + "' doesn't match valid date formats")
 
 
-class TSInstant(object):
+@dataclass(frozen=True, slots=True)
+class TSInstant:
     """
     TSInstant: a generalised "moment in time", including both timepoint and
     optional index within a timepoint.
@@ -59,24 +78,39 @@ class TSInstant(object):
     2017_01_02_03_04_05_00
     >>> TSInstant(datetime.datetime(2017, 01, 02, 03, 04, 05), 0, "0011")
     2017_01_02_03_04_05_00_0011
-    """
 
-    def __init__(self, datetime, subsecond=0, index=None):
-        self.datetime = parse_date(datetime)
-        if subsecond is None:
-            subsecond = 0
-        self.subsecond = int(subsecond)
-        self.index = index
+    Instants are immutable and slotted: one is created per file, so for large
+    timestreams the per-instance ``__dict__`` overhead of a regular class adds
+    up to a lot of wasted heap.
+    """
 
-    def __str__(self):
+    datetime: datetime.datetime
+    subsecond: int = 0
+    index: str = None
+    # string form, precomputed once rather than strftime-ing on every
+    # __str__/__repr__ call
+    _str: str = field(init=False, repr=False, compare=False, default=None)
+
+    def __post_init__(self):
+        object.__setattr__(self, "datetime", parse_date(self.datetime))
+        object.__setattr__(self, "subsecond",
+                           0 if self.subsecond is None else int(self.subsecond))
+        if self.index is not None:
+            # indices repeat across many files (e.g. camera ids), so intern
+            object.__setattr__(self, "index", sys.intern(str(self.index)))
         idx = "" if self.index is None else f"_{self.index}"
-        subsec = f"_{self.subsecond:02d}"
-        return f"{self.datetime.strftime('%Y_%m_%d_%H_%M_%S')}{subsec}{idx}"
+        d = self.datetime
+        # f-string on the components rather than strftime: the format is
+        # fixed and ASCII-only, so skip strftime's locale and format-string
+        # machinery
+        object.__setattr__(self, "_str",
+                           f"{d.year:04d}_{d.month:02d}_{d.day:02d}"
+                           f"_{d.hour:02d}_{d.minute:02d}_{d.second:02d}"
+                           f"_{self.subsecond:02d}{idx}")
 
+    def __str__(self):
+        return self._str
 
-    def __eq__(self, other):
-        return (self.datetime, self.subsecond, self.index) == \
-               (other.datetime, other.subsecond, other.index)
 
     def __lt__(self, other):
         if self.index is not None and other.index is not None:
@@ -110,14 +144,13 @@ class TSInstant(object):
             return (self.datetime, self.subsecond) >= \
                 (other.datetime, other.subsecond)
 
-    def __hash__(self):
-        return hash(str(self))
-
     def __repr__(self):
         return str(self)
 
     def iso8601(self):
-        return self.datetime.strftime("%Y-%m-%dT%H:%M:%S")
+        d = self.datetime
+        return (f"{d.year:04d}-{d.month:02d}-{d.day:02d}"
+                f"T{d.hour:02d}:{d.minute:02d}:{d.second:02d}")
 
     @classmethod
     def now(cls):
@@ -148,6 +181,44 @@ class TSInstant(object):
             index = index.lstrip("_")
         return TSInstant(datetime, subsec, index)
 
+    @staticmethod
+    def from_paths(paths):
+        """Batch variant of from_path, for parsing many paths in one go.
+
+        The datetime portion of all paths is converted in a single bulk call
+        to numpy's C datetime64 parser, rather than one Python-level parse
+        per path, which speeds up the initial scan of large timestreams.
+
+        :param paths: Iterable of file paths, with or without directories
+        """
+        import numpy as np
+
+        matches = []
+        datestrs = []
+        for path in paths:
+            fn = op.splitext(op.basename(path))[0]
+            m = TS_DATETIME_RE.search(fn)
+            if m is None:
+                raise ValueError("path '" + path + "' doesn't contain a timestream date")
+            matches.append(m)
+            d = m[1]
+            # YYYY_mm_dd_HH_MM_SS -> iso8601 so numpy can parse it
+            datestrs.append(f"{d[0:4]}-{d[5:7]}-{d[8:10]}T{d[11:13]}:{d[14:16]}:{d[17:19]}")
+        datetimes = np.array(datestrs, dtype="datetime64[s]").tolist()
+
+        instants = []
+        for m, datetime in zip(matches, datetimes):
+            _, subsec, index = m.groups()
+            if subsec is not None:
+                try:
+                    subsec = int(subsec.lstrip("_"))
+                except ValueError:
+                    subsec = 0
+            if index is not None:
+                index = index.lstrip("_")
+            instants.append(TSInstant(datetime, subsec, index))
+        return instants
+
 def parse_partial_date(datestr, max=False):
     m = re.search(r"_?(?P<Y>\d\d\d\d)(?:_(?P<m>\d\d)(?:_(?P<d>\d\d))?(?:_(?P<H>\d\d))?(?:_(?P<M>\d\d))?(?:_(?P<S>\d\d))?)?",
                   datestr)
@@ -11,8 +11,9 @@ import re
 import tarfile
 import warnings
 import zipfile
+from collections import OrderedDict
 from queue import Queue
-from threading import Thread
+from threading import Thread, local
 from pathlib import Path
 import hashlib
 import zlib
@@ -54,23 +55,63 @@ def path_is_timestream_file(path, extensions=None):
         return False
 
 
+# Per-thread (and so per-worker-process) cache of open bundle handles, so
+# that fetching many members of one bundle doesn't reopen and rescan the
+# archive index once per file. Thread-local so handles are never shared
+# across pipeline worker threads, which zipfile/tarfile don't support.
+_BUNDLE_HANDLE_CACHE_SIZE = 8
+_bundle_handles = local()
+
+
+def _cached_bundle(opener, path):
+    cache = getattr(_bundle_handles, "handles", None)
+    if cache is None:
+        cache = _bundle_handles.handles = OrderedDict()
+    key = (opener, str(path))
+    handle = cache.get(key)
+    if handle is None:
+        while len(cache) >= _BUNDLE_HANDLE_CACHE_SIZE:
+            _, oldest = cache.popitem(last=False)
+            oldest.close()
+        handle = cache[key] = opener(str(path))
+    else:
+        cache.move_to_end(key)
+    return handle
+
+
 class ZipContentFetcher(object):
-    def __init__(self, zipfile, pathinzip):
+    def __init__(self, zipfile, pathinzip, size=None):
         self.zipfile = zipfile
         self.pathinzip = pathinzip
+        self._size = size
+
+    def _zipfile(self):
+        return _cached_bundle(zipfile.ZipFile, self.zipfile)
 
     def get(self):
-        with zipfile.ZipFile(str(self.zipfile)) as zfh:
-            return zfh.read(self.pathinzip)
+        return self._zipfile().read(self.pathinzip)
+
+    def size(self):
+        if self._size is None:
+            self._size = self._zipfile().getinfo(self.pathinzip).file_size
+        return self._size
 
 class TarContentFetcher(object):
-    def __init__(self, tarfile, pathintar):
+    def __init__(self, tarfile, pathintar, size=None):
         self.tarfile = tarfile
         self.pathintar = pathintar
+        self._size = size
+
+    def _tarfile(self):
+        return _cached_bundle(tarfile.TarFile, self.tarfile)
 
     def get(self):
-        with tarfile.TarFile(self.tarfile) as tfh:
-            return tfh.extractfile(self.pathintar).read()
+        return self._tarfile().extractfile(self.pathintar).read()
+
+    def size(self):
+        if self._size is None:
+            self._size = self._tarfile().getmember(self.pathintar).size
+        return self._size
 
 
 class FileContentFetcher(object):
@@ -81,6 +122,9 @@ class FileContentFetcher(object):
         with open(self.path, "rb") as fh:
             return fh.read()
 
+    def size(self):
+        return op.getsize(self.path)
+
 
 
 class TimestreamFile(object):
@@ -112,6 +156,28 @@ class TimestreamFile(object):
             self._content = self.fetcher.get()
         return self._content
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if state.get("fetcher") is not None:
+            # content is recoverable from the fetcher on the far side, so
+            # don't ship (potentially multi-MB) file bytes through the pickle
+            # round-trip to/from pipeline workers
+            state["_content"] = None
+        return state
+
+    @property
+    def size(self):
+        """File size in bytes, from bundle/filesystem metadata if possible.
+
+        Unlike len(file), this doesn't force the whole file body into memory
+        when the file is backed by a fetcher.
+        """
+        if self._content is not None:
+            return len(self._content)
+        if self.fetcher is not None:
+            return self.fetcher.size()
+        return len(self.content)
+
     def clear_content(self):
         del self._content
         self._content = None
@@ -226,9 +292,11 @@ class TimeStream(object):
                             continue
                         if self.timefilter is not None and not self.timefilter.partial_within(op.basename(entry.filename)):
                             continue
-                        self._files[op.basename(entry.filename)] = ZipContentFetcher(path, entry.filename)
+                        self._files[op.basename(entry.filename)] = \
+                            ZipContentFetcher(path, entry.filename, size=entry.file_size)
                         yield TimestreamFile(filename=entry.filename,
-                                                fetcher=ZipContentFetcher(path, entry.filename))
+                                                fetcher=ZipContentFetcher(path, entry.filename,
+                                                                          size=entry.file_size))
             elif tarfile.is_tarfile(path):
                 self.sorted = False
                 warnings.warn("Extracting files from a tar file. Sorted iteration is not guaranteed")
@@ -244,9 +312,11 @@ class TimeStream(object):
                             filebytes = tar.extractfile(entry).read()
                             yield TimestreamFile.from_bytes(filebytes, filename=entry.name)
                         else:
-                            self._files[op.basename(entry.name)] = TarContentFetcher(path, entry.name)
+                            self._files[op.basename(entry.name)] = \
+                                TarContentFetcher(path, entry.name, size=entry.size)
                             yield TimestreamFile(filename=entry.name,
-                                                    fetcher=TarContentFetcher(path, entry.name))
+                                                    fetcher=TarContentFetcher(path, entry.name,
+                                                                              size=entry.size))
             else: raise ValueError(f"'{path}' appears not to be an archive")
 
         def is_archive(path):
@@ -263,6 +333,17 @@ class TimeStream(object):
             # ensure sorted iteration
             dirs.sort()
             files.sort(key=lambda f: extract_datetime(f))
+            # bulk-parse instants for the whole directory in one go, which is
+            # much faster than one python-level parse per file
+            candidates = [f for f in files
+                          if not f.startswith(".") and
+                          path_is_timestream_file(f, extensions=self.format)]
+            try:
+                instants = dict(zip(candidates, TSInstant.from_paths(candidates)))
+            except ValueError:
+                # some name failed to parse; fall back to per-file parsing so
+                # from_path can warn about the bad one in situ
+                instants = {}
             for file in files:
                 path = op.join(root, file)
                 if self.timefilter is not None and not self.timefilter.partial_within(file):
@@ -276,7 +357,7 @@ class TimeStream(object):
                         yield from walk_archive(path)
                     if path_is_timestream_file(path, extensions=self.format):
                         self._files[op.basename(path)] = FileContentFetcher(path)
-                        yield TimestreamFile.from_path(path)
+                        yield TimestreamFile.from_path(path, instant=instants.get(file))
                 except Exception as exc:
                     warnings.warn(f"{exc.__class__.__name__}: {str(exc)} at '{path}'")
 
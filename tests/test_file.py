@@ -12,3 +12,29 @@ def test_file(data):
     assert f.format == "jpg"
     assert f.md5sum == "f082ca6435195428ea50058edec9c189"
 
+
+def test_file_size(data):
+    f = TimestreamFile.from_path(data("images/GC37L~320_2019_04_01_00_00_00.jpg"))
+
+    # size should come from a stat, without fetching the content
+    assert f.size > 0
+    assert f._content is None
+    assert f.size == len(f.content)
+
+
+def test_file_pickle(data):
+    import pickle
+    f = TimestreamFile.from_path(data("images/GC37L~320_2019_04_01_00_00_00.jpg"))
+
+    # fetcher-backed files shouldn't ship their bytes through pickle
+    _ = f.content
+    roundtripped = pickle.loads(pickle.dumps(f))
+    assert roundtripped._content is None
+    assert roundtripped.instant == f.instant
+    assert roundtripped.md5sum == f.md5sum
+
+    # but files whose content exists only in memory must keep it
+    inmem = TimestreamFile.from_bytes(b"somebytes", "2019_04_01_00_00_00_00.bin")
+    roundtripped = pickle.loads(pickle.dumps(inmem))
+    assert roundtripped.content == b"somebytes"
+
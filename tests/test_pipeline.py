@@ -72,6 +72,20 @@ def test_decoderaw(largedata):
 
 
 
+def test_decode_reuse_buffer(data):
+    step = DecodeImageFileStep(reuse_buffer=True)
+    file = TimestreamFile.from_path(data("images/GC37L~320_2019_04_01_00_00_00.jpg"))
+
+    first = step.process_file(file)
+    expect = DecodeImageFileStep().process_file(file)
+    assert np.array_equal(first.pixels, expect.pixels)
+
+    # same shape: the decode buffer should be reused, not reallocated
+    second = step.process_file(file)
+    assert second.pixels is first.pixels
+    assert np.array_equal(second.pixels, expect.pixels)
+
+
 def test_imagepixels():
     pixels = np.array([[[1.,1.,1.], [0., 0., 0.]]], dtype=float)
     instant = TSInstant.now()
@@ -100,3 +114,117 @@ def test_pipeline(data, tmpdir):
         assert files == newfiles
     dotest(1)
     dotest(3)
+
+
+def test_pipeline_pickle():
+    import pickle
+    pipe = TSPipeline(CopyStep())
+    pipe.report.record(TSInstant("2019_01_01_00_00_00"), FileName="f")
+
+    # recorded rows must not ride along to pool workers
+    clone = pickle.loads(pickle.dumps(pipe))
+    assert len(clone.report.data) == 0
+    assert len(pipe.report.data) == 1
+
+
+def test_process_to_write_error(data):
+    class FailingTimestream(object):
+        def write(self, file):
+            raise RuntimeError("disk full")
+
+    pipe = TSPipeline()
+    with pytest.raises(RuntimeError, match="disk full"):
+        pipe.process_to(TimeStream(data("timestreams/flat")), FailingTimestream())
+
+
+def test_writefilestep_async(data, tmpdir):
+    output = TimeStream(tmpdir.join("test_ts_asyncwrite"))
+    pipe = TSPipeline(WriteFileStep(output, async_writes=True))
+
+    files = {}
+    for file in pipe.process(TimeStream(data("timestreams/flat"))):
+        files[str(file.instant)] = file.md5sum
+    pipe.finish()
+
+    newfiles = {}
+    for file in output:
+        newfiles[str(file.instant)] = file.md5sum
+
+    assert files == newfiles
+
+
+def test_resultrecorder_streaming(tmpdir):
+    outpath = str(tmpdir.join("report.tsv"))
+    recorder = ResultRecorder()
+    recorder.open_streaming(outpath, flush_interval=3)
+    instants = []
+    for i in range(10):
+        instant = TSInstant("2019_01_01_00_00_{:02d}".format(i))
+        instants.append(instant)
+        recorder.record(instant, FileName=f"file_{i}", FileSize=i)
+    recorder.close_streaming()
+
+    with open(outpath) as fh:
+        lines = fh.read().splitlines()
+    assert lines[0].split("\t") == ['"Instant"', '"FileName"', '"FileSize"']
+    assert len(lines) == 11
+    for i, line in enumerate(lines[1:]):
+        assert line.split("\t") == [f'"{instants[i]}"', f'"file_{i}"', str(i)]
+
+
+def test_resultrecorder_streaming_evict(tmpdir):
+    outpath = str(tmpdir.join("report.tsv"))
+    recorder = ResultRecorder()
+    recorder.open_streaming(outpath, flush_interval=3, evict=True)
+    for i in range(10):
+        recorder.record(TSInstant("2019_01_01_00_00_{:02d}".format(i)),
+                        FileName=f"file_{i}", FileSize=i)
+        assert len(recorder.data) <= 3
+    recorder.close_streaming()
+
+    with open(outpath) as fh:
+        lines = fh.read().splitlines()
+    assert len(lines) == 11
+
+
+def test_resultrecorder_streaming_preseed(tmpdir):
+    outpath = str(tmpdir.join("report.tsv"))
+    recorder = ResultRecorder()
+    recorder.open_streaming(outpath, flush_interval=3, evict=True,
+                            fields=["FileName", "Errors"])
+    for i in range(10):
+        recorder.record(TSInstant("2019_01_01_00_00_{:02d}".format(i)),
+                        FileName=f"file_{i}")
+    # "Errors" first appears well after the header was frozen, but must
+    # still land in its pre-seeded column
+    recorder.record(TSInstant("2019_01_01_00_01_00"), FileName="bad_file",
+                    Errors="some error")
+    recorder.close_streaming()
+
+    with open(outpath) as fh:
+        lines = fh.read().splitlines()
+    assert lines[0].split("\t") == ['"Instant"', '"FileName"', '"Errors"']
+    assert lines[-1].split("\t")[-1] == '"some error"'
+
+
+def test_pipeline_report_fields():
+    pipe = TSPipeline(FileStatsStep(), CopyStep())
+    assert pipe.report_fields == ["FileName", "FileSize", "Errors"]
+
+
+def test_pipeline_staged(data, tmpdir):
+    def dotest(ncpus):
+        output = TimeStream(tmpdir.join("test_ts_staged_{}".format(ncpus)))
+        pipe = TSPipeline(CopyStep(), WriteFileStep(output))
+
+        files = {}
+        for file in pipe.process_staged(TimeStream(data("timestreams/flat")), ncpus=ncpus):
+            files[str(file.instant)] = file.md5sum
+
+        newfiles = {}
+        for file in output:
+            newfiles[str(file.instant)] = file.md5sum
+
+        assert files == newfiles
+    dotest(1)
+    dotest(3)
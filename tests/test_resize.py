@@ -31,3 +31,33 @@ def test_resize(data):
     assert cols == 100
     assert depth == odepth
     assert rows < orows
+
+
+def test_thumbnail(data):
+    img = TimestreamImage.from_path(data("images/GC37L~320_2019_04_01_00_00_00.jpg"))
+    orows, ocols, _ = img.pixels.shape
+
+    thumb = ThumbnailStep(max_side=100).process_file(img)
+    rows, cols, depth = thumb.pixels.shape
+    assert max(rows, cols) == 100
+    assert depth == 3
+    # mean colour should survive thumbnailing
+    assert np.allclose(thumb.pixels.mean(axis=(0, 1)),
+                       img.pixels.mean(axis=(0, 1)), atol=0.01)
+
+    # images already small enough pass through untouched
+    assert ThumbnailStep(max_side=max(orows, ocols)).process_file(img) is img
+
+
+def test_downsize_encode(data):
+    file = TimestreamFile.from_path(data("images/GC37L~320_2019_04_01_00_00_00.jpg"))
+    orows, ocols, _ = TimestreamImage.from_path(data("images/GC37L~320_2019_04_01_00_00_00.jpg")).pixels.shape
+
+    downsized = DownsizeEncodeStep(cols=100, format="jpg").process_file(file)
+    assert isinstance(downsized, TimestreamFile)
+    assert downsized.instant == file.instant
+
+    pil = Image.open(BytesIO(downsized.content))
+    assert pil.format == "JPEG"
+    assert pil.width == 100
+    assert pil.height < orows
@@ -23,6 +23,18 @@ def test_tsinstant_cmp():
         assert bigger <= bigger
 
 
+def test_tsinstant_from_paths():
+    paths = [
+        "test_2018_12_31_23_59_59_00.jpg",
+        "some/dir/test_2019_12_31_23_59_59_00_1.jpg",
+        "2019_01_01_00_00_00_00_0011.tif",
+    ]
+    assert TSInstant.from_paths(paths) == [TSInstant.from_path(p) for p in paths]
+
+    with pytest.raises(ValueError):
+        TSInstant.from_paths(["not-a-timestream.jpg"])
+
+
 def test_timefilter():
     dtnow = dt.datetime.now()
     dnow = dtnow.date()